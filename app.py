@@ -1,10 +1,28 @@
-from flask import Flask, request, jsonify, render_template
+from flask import Flask, request, jsonify, render_template, render_template_string, Response, stream_with_context, send_file, abort
 from flask_sqlalchemy import SQLAlchemy
-from datetime import datetime
+from sqlalchemy import func, update, inspect, text, insert, select, exists
+from sqlalchemy.exc import IntegrityError
+from datetime import datetime, date, timedelta
 import openai
 import os
 from dotenv import load_dotenv
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
 import json
+import threading
+import time
+import zlib
+import gzip
+import base64
+import io
+import re
+import hashlib
+import mimetypes
+import click
+from werkzeug.security import safe_join
 
 # Load environment variables
 load_dotenv()
@@ -38,10 +56,11 @@ class Quiz(db.Model):
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     completed = db.Column(db.Boolean, default=False)
     score = db.Column(db.Integer, nullable=True)
-    course_name = db.Column(db.String(255), nullable=False)
+    course_name = db.Column(db.String(255), nullable=False, index=True)
     completed_date = db.Column(db.Date, nullable=True)
     total_questions = db.Column(db.Integer, nullable=True)
     user_answers = db.Column(db.JSON, nullable=True)
+    archived_at = db.Column(db.DateTime, nullable=True)
 
 class UserStats(db.Model):
     id = db.Column(db.Integer, primary_key=True)
@@ -83,7 +102,7 @@ class UserStats(db.Model):
 
 class CompletedCourse(db.Model):
     id = db.Column(db.Integer, primary_key=True)
-    course_name = db.Column(db.String(255), nullable=False)
+    course_name = db.Column(db.String(255), nullable=False, index=True)
     completion_date = db.Column(db.DateTime, nullable=False)
     total_score = db.Column(db.Integer, nullable=False)
     total_questions = db.Column(db.Integer, nullable=False)
@@ -91,9 +110,978 @@ class CompletedCourse(db.Model):
     quizzes_completed = db.Column(db.Integer, nullable=False)
     quizzes_per_day = db.Column(db.Integer, nullable=False)
 
+class DailyActivity(db.Model):
+    """Per-day rollup of completed quizzes, keyed by (user, day, course)."""
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'day', 'course_name', name='uq_daily_activity_user_day_course'),
+        db.Index('ix_daily_activity_day_course', 'day', 'course_name'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user_stats.id'), nullable=False)
+    day = db.Column(db.Date, nullable=False)
+    course_name = db.Column(db.String(255), nullable=False)
+    quizzes_completed = db.Column(db.Integer, nullable=False, default=0)
+    correct_answers = db.Column(db.Integer, nullable=False, default=0)
+    total_questions = db.Column(db.Integer, nullable=False, default=0)
+    stars_earned = db.Column(db.Integer, nullable=False, default=0)
+
+class QuotaGeneration(db.Model):
+    """Single row bumped whenever daily quota counts can go down (deletes, imports)."""
+    id = db.Column(db.Integer, primary_key=True)
+    generation = db.Column(db.Integer, nullable=False, default=0)
+
+def bump_quota_generation():
+    """Tell every worker to drop its cached quota counts, as part of the current transaction."""
+    bump = update(QuotaGeneration).where(QuotaGeneration.id == 1).values(
+        generation=QuotaGeneration.generation + 1
+    ).execution_options(synchronize_session=False)
+    if db.session.execute(bump).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(QuotaGeneration(id=1, generation=1))
+    except IntegrityError:
+        db.session.execute(bump)
+
+class QuizArchive(db.Model):
+    """Compressed questions and answers of a quiz whose course is completed."""
+    id = db.Column(db.Integer, primary_key=True)
+    quiz_id = db.Column(db.Integer, nullable=False, unique=True)
+    course_name = db.Column(db.String(255), nullable=False)
+    completed_date = db.Column(db.Date, nullable=True)
+    score = db.Column(db.Integer, nullable=True)
+    total_questions = db.Column(db.Integer, nullable=True)
+    answer_key = db.Column(db.JSON, nullable=False)
+    payload = db.Column(db.LargeBinary, nullable=False)
+    archived_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def get_payload(self):
+        return json.loads(zlib.decompress(self.payload).decode('utf-8'))
+
+class PromptStats(db.Model):
+    """Token usage and parse failures per prompt template version."""
+    version = db.Column(db.String(32), primary_key=True)
+    calls = db.Column(db.Integer, nullable=False, default=0)
+    parse_failures = db.Column(db.Integer, nullable=False, default=0)
+    questions = db.Column(db.Integer, nullable=False, default=0)
+    prompt_tokens = db.Column(db.Integer, nullable=False, default=0)
+    completion_tokens = db.Column(db.Integer, nullable=False, default=0)
+
+class CourseDeletion(db.Model):
+    """Tombstone for a deleted course whose rows are purged in the background.
+
+    Quizzes and completed course entries up to the recorded ids are hidden
+    from every query as soon as the tombstone exists, so a course recreated
+    under the same name starts from a clean slate.
+    """
+    id = db.Column(db.Integer, primary_key=True)
+    course_name = db.Column(db.String(255), nullable=False, index=True)
+    max_quiz_id = db.Column(db.Integer, nullable=False, default=0)
+    max_completed_course_id = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_total = db.Column(db.Integer, nullable=False, default=0)
+    quizzes_purged = db.Column(db.Integer, nullable=False, default=0)
+    requested_at = db.Column(db.DateTime, default=datetime.utcnow)
+    completed_at = db.Column(db.DateTime, nullable=True)
+
+def not_deleted(model):
+    """Filter hiding Quiz, QuizArchive or CompletedCourse rows of deleted courses."""
+    if model is Quiz:
+        row_id, cutoff = Quiz.id, CourseDeletion.max_quiz_id
+    elif model is QuizArchive:
+        row_id, cutoff = QuizArchive.quiz_id, CourseDeletion.max_quiz_id
+    else:
+        row_id, cutoff = CompletedCourse.id, CourseDeletion.max_completed_course_id
+
+    return ~exists().where(
+        CourseDeletion.completed_at.is_(None),
+        CourseDeletion.course_name == model.course_name,
+        row_id <= cutoff
+    )
+
+def load_questions(questions):
+    """Quizzes store their questions either as a list or as a JSON encoded string."""
+    if isinstance(questions, str):
+        return json.loads(questions)
+    return questions or []
+
+def record_daily_activity(user_id, day, course_name, correct_answers, total_questions, stars_earned,
+                          quizzes_completed=1):
+    """Add a completed quiz to the rollup row for (user, day, course).
+
+    The counters are bumped with a single UPDATE so concurrent completions
+    never lose increments; the row is only inserted the first time a course
+    is played on a given day. Pass negative values with quizzes_completed=-1
+    to take a quiz back out of a day.
+    """
+    row_filter = (
+        DailyActivity.user_id == user_id,
+        DailyActivity.day == day,
+        DailyActivity.course_name == course_name
+    )
+    increment = update(DailyActivity).where(*row_filter).values(
+        quizzes_completed=DailyActivity.quizzes_completed + quizzes_completed,
+        correct_answers=DailyActivity.correct_answers + correct_answers,
+        total_questions=DailyActivity.total_questions + total_questions,
+        stars_earned=DailyActivity.stars_earned + stars_earned
+    ).execution_options(synchronize_session=False)
+
+    if db.session.execute(increment).rowcount or quizzes_completed <= 0:
+        if quizzes_completed < 0:
+            # A day left without quizzes must not count as active for streaks
+            DailyActivity.query.filter(*row_filter, DailyActivity.quizzes_completed <= 0).delete(
+                synchronize_session='fetch'
+            )
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(DailyActivity(
+                user_id=user_id,
+                day=day,
+                course_name=course_name,
+                quizzes_completed=quizzes_completed,
+                correct_answers=correct_answers,
+                total_questions=total_questions,
+                stars_earned=stars_earned
+            ))
+    except IntegrityError:
+        # Another worker created the row first, fall back to incrementing it
+        db.session.execute(increment)
+
+# Activity of deleted courses is kept under this name, which no course can have,
+# so the days still count for streaks and the calendar but not for any course
+DELETED_COURSE_ACTIVITY = ''
+
+def retire_course_activity(course_name):
+    """Move a deleted course's rollup rows into the DELETED_COURSE_ACTIVITY bucket."""
+    for row in DailyActivity.query.filter_by(course_name=course_name).all():
+        record_daily_activity(
+            user_id=row.user_id,
+            day=row.day,
+            course_name=DELETED_COURSE_ACTIVITY,
+            correct_answers=row.correct_answers,
+            total_questions=row.total_questions,
+            stars_earned=row.stars_earned,
+            quizzes_completed=row.quizzes_completed
+        )
+        db.session.delete(row)
+
+def rebuild_daily_activity():
+    """Recompute the whole rollup from completed quizzes. Returns the row count."""
+    user_stats = UserStats.query.first()
+    if not user_stats:
+        user_stats = UserStats()
+        db.session.add(user_stats)
+        db.session.flush()
+
+    DailyActivity.query.delete()
+    totals = db.session.query(
+        Quiz.completed_date,
+        Quiz.course_name,
+        func.count(Quiz.id),
+        func.coalesce(func.sum(Quiz.score), 0),
+        func.coalesce(func.sum(Quiz.total_questions), 0)
+    ).filter(
+        Quiz.completed == True,
+        Quiz.completed_date.isnot(None),
+        not_deleted(Quiz)
+    ).group_by(Quiz.completed_date, Quiz.course_name).all()
+
+    for day, course_name, quizzes, correct, questions in totals:
+        db.session.add(DailyActivity(
+            user_id=user_stats.id,
+            day=day,
+            course_name=course_name,
+            quizzes_completed=quizzes,
+            correct_answers=correct,
+            total_questions=questions,
+            stars_earned=5 * quizzes + correct  # Base stars + correct answers
+        ))
+    db.session.commit()
+    return len(totals)
+
+def compute_streaks(active_days, today):
+    """Return (current_streak, longest_streak) for a sorted list of active days."""
+    longest = run = 0
+    previous = None
+    for day in active_days:
+        run = run + 1 if previous and (day - previous).days == 1 else 1
+        longest = max(longest, run)
+        previous = day
+
+    # A streak is still alive if the last active day was today or yesterday
+    current = run if previous and (today - previous).days <= 1 else 0
+    return current, longest
+
+def get_active_days(user_id):
+    return [row.day for row in db.session.query(DailyActivity.day).filter(
+        DailyActivity.user_id == user_id
+    ).distinct().order_by(DailyActivity.day)]
+
+class DailyQuota:
+    """Per-course counters of quizzes completed on the current UTC day.
+
+    Counts only grow within a day, so once a course hits its limit the
+    request can be rejected from memory for the rest of the day. Below the
+    limit the count is refreshed from the DailyActivity rollup, which every
+    worker increments atomically, so workers stay consistent with each other.
+
+    Deleting or re-importing a course is the one way a count can drop. Those
+    bump the shared QuotaGeneration row, which each worker reads at most once
+    every check_interval seconds and then drops its cached counts.
+    """
+
+    def __init__(self, check_interval=60):
+        self.check_interval = check_interval
+        self._lock = threading.Lock()
+        self._day = None
+        self._counts = {}
+        self._limits = {}
+        self._generation = None
+        self._checked_at = None
+
+    def _roll_over(self, today):
+        # Called with the lock held
+        if self._day != today:
+            self._day = today
+            self._counts = {}
+
+    def _check_generation(self):
+        now = time.monotonic()
+        if self._checked_at is not None and now - self._checked_at < self.check_interval:
+            return
+
+        generation = db.session.query(QuotaGeneration.generation).filter(QuotaGeneration.id == 1).scalar() or 0
+        with self._lock:
+            if generation != self._generation:
+                self._generation = generation
+                self._counts = {}
+            self._checked_at = now
+
+    def is_exhausted(self, course_name, today):
+        """Answer from memory, apart from the occasional generation check."""
+        self._check_generation()
+        with self._lock:
+            self._roll_over(today)
+            limit = self._limits.get(course_name)
+            count = self._counts.get(course_name)
+            return limit is not None and count is not None and count >= limit
+
+    def set_limit(self, course_name, limit):
+        with self._lock:
+            self._limits[course_name] = limit
+
+    def completed_today(self, course_name, today):
+        self._check_generation()
+        count = db.session.query(
+            func.coalesce(func.sum(DailyActivity.quizzes_completed), 0)
+        ).filter(
+            DailyActivity.day == today,
+            DailyActivity.course_name == course_name
+        ).scalar()
+
+        with self._lock:
+            self._roll_over(today)
+            count = max(count, self._counts.get(course_name, 0))
+            self._counts[course_name] = count
+        return count
+
+    def record_completion(self, course_name, today):
+        """Count a quiz that was not yet counted as completed today."""
+        with self._lock:
+            self._roll_over(today)
+            if course_name in self._counts:
+                self._counts[course_name] += 1
+
+    def forget(self, course_name):
+        with self._lock:
+            self._counts.pop(course_name, None)
+            self._limits.pop(course_name, None)
+
+    def reset(self):
+        with self._lock:
+            self._day = None
+            self._counts = {}
+            self._limits = {}
+            self._generation = None
+            self._checked_at = None
+
+daily_quota = DailyQuota()
+
+def ensure_schema():
+    """Add columns and indexes introduced after a table was first created.
+
+    db.create_all() only creates missing tables, so databases from older
+    versions are brought up to date here. New columns must be nullable.
+    """
+    inspector = inspect(db.engine)
+    existing_tables = inspector.get_table_names()
+    for table in db.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+
+        existing_columns = {column['name'] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name not in existing_columns:
+                column_type = column.type.compile(dialect=db.engine.dialect)
+                with db.engine.begin() as conn:
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+                print(f"Added column {table.name}.{column.name}")
+
+        for index in table.indexes:
+            index.create(db.engine, checkfirst=True)
+
+def compact_quizzes(batch_size=200):
+    """Move question and answer payloads of completed courses into QuizArchive.
+
+    Score, totals and dates stay on the Quiz row so stats keep working, and
+    the answer key is kept uncompressed on the archive row. Each batch is
+    committed on its own to keep write locks short. Returns the number of
+    quizzes archived and the payload bytes before and after compression.
+    """
+    report = {'quizzes_archived': 0, 'payload_bytes': 0, 'compressed_bytes': 0}
+    completed_courses = db.session.query(CompletedCourse.course_name).filter(not_deleted(CompletedCourse))
+    last_id = 0
+
+    while True:
+        quizzes = Quiz.query.filter(
+            Quiz.id > last_id,
+            Quiz.completed == True,
+            Quiz.archived_at.is_(None),
+            Quiz.course_name.in_(completed_courses),
+            not_deleted(Quiz)
+        ).order_by(Quiz.id).limit(batch_size).all()
+        if not quizzes:
+            break
+
+        archived_at = datetime.utcnow()
+        for quiz in quizzes:
+            questions = load_questions(quiz.questions)
+            raw = json.dumps({'questions': questions, 'user_answers': quiz.user_answers}).encode('utf-8')
+            payload = zlib.compress(raw, 9)
+
+            db.session.add(QuizArchive(
+                quiz_id=quiz.id,
+                course_name=quiz.course_name,
+                completed_date=quiz.completed_date,
+                score=quiz.score,
+                total_questions=quiz.total_questions,
+                answer_key=[question.get('correct_answer') for question in questions],
+                payload=payload,
+                archived_at=archived_at
+            ))
+            quiz.questions = []
+            quiz.user_answers = None
+            quiz.archived_at = archived_at
+
+            report['payload_bytes'] += len(raw)
+            report['compressed_bytes'] += len(payload)
+
+        db.session.commit()
+        report['quizzes_archived'] += len(quizzes)
+        last_id = quizzes[-1].id
+
+    return report
+
+def vacuum_database():
+    """Return free pages to the filesystem and report the bytes reclaimed.
+
+    The first run switches SQLite to incremental auto-vacuum, which needs
+    one full VACUUM; after that only the free pages are released.
+    """
+    if db.engine.dialect.name != 'sqlite':
+        return 0
+
+    db.session.remove()
+    with db.engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        page_size = conn.execute(text('PRAGMA page_size')).scalar()
+        pages_before = conn.execute(text('PRAGMA page_count')).scalar()
+
+        if conn.execute(text('PRAGMA auto_vacuum')).scalar() != 2:
+            conn.execute(text('PRAGMA auto_vacuum = INCREMENTAL'))
+            conn.execute(text('VACUUM'))
+        else:
+            # Executed as a statement the pragma frees a single page per step,
+            # as a script SQLite runs it to completion
+            conn.connection.driver_connection.executescript('PRAGMA incremental_vacuum;')
+
+        pages_after = conn.execute(text('PRAGMA page_count')).scalar()
+
+    # Converting to incremental mode adds pointer-map pages, so the file can grow once
+    return max(pages_before - pages_after, 0) * page_size
+
+def run_compaction(batch_size=200, vacuum=True):
+    report = compact_quizzes(batch_size)
+    report['bytes_reclaimed'] = vacuum_database() if vacuum else 0
+    return report
+
+def start_compaction_scheduler(interval_hours):
+    """Run the compaction job every interval_hours on a daemon thread."""
+    def run():
+        while True:
+            time.sleep(interval_hours * 3600)
+            with app.app_context():
+                try:
+                    print(f"Compaction finished: {run_compaction()}")
+                except Exception as e:
+                    db.session.rollback()
+                    print(f"Error compacting database: {str(e)}")
+
+    thread = threading.Thread(target=run, name='compaction-scheduler', daemon=True)
+    thread.start()
+    return thread
+
+@app.cli.command('compact')
+@click.option('--batch-size', default=200, show_default=True, help='Quizzes archived per transaction.')
+@click.option('--no-vacuum', is_flag=True, help='Skip the VACUUM step.')
+def compact_command(batch_size, no_vacuum):
+    """Archive quiz payloads of completed courses and vacuum the database."""
+    report = run_compaction(batch_size, vacuum=not no_vacuum)
+    click.echo(f"Archived {report['quizzes_archived']} quizzes "
+               f"({report['payload_bytes']} bytes compressed to {report['compressed_bytes']}), "
+               f"reclaimed {report['bytes_reclaimed']} bytes")
+
+# Tables moved by export/import, parents first. DailyActivity is rebuilt after an import.
+EXPORT_MODELS = {
+    'user_stats': UserStats,
+    'course': Course,
+    'quiz': Quiz,
+    'quiz_archive': QuizArchive,
+    'completed_course': CompletedCourse
+}
+
+def _encode_value(value):
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, bytes):
+        return base64.b64encode(value).decode('ascii')
+    return value
+
+def _column_decoders(model):
+    decoders = {}
+    for column in model.__table__.columns:
+        if isinstance(column.type, db.DateTime):
+            decoders[column.name] = datetime.fromisoformat
+        elif isinstance(column.type, db.Date):
+            decoders[column.name] = date.fromisoformat
+        elif isinstance(column.type, db.LargeBinary):
+            decoders[column.name] = base64.b64decode
+    return decoders
+
+def iter_export_lines(chunk_size=1000):
+    """Yield every exported record as one NDJSON line.
+
+    Rows are streamed with yield_per so memory stays flat however large the
+    tables are.
+    """
+    for record_type, model in EXPORT_MODELS.items():
+        table = model.__table__
+        query = select(*table.columns).order_by(table.c.id)
+        if model in (Quiz, QuizArchive, CompletedCourse):
+            query = query.where(not_deleted(model))
+        rows = db.session.execute(query.execution_options(yield_per=chunk_size))
+        for row in rows:
+            data = {name: _encode_value(value) for name, value in row._mapping.items()}
+            yield json.dumps({'type': record_type, 'data': data}) + '\n'
+
+def iter_gzip(lines):
+    compressor = zlib.compressobj(9, zlib.DEFLATED, 31)  # wbits=31 writes a gzip container
+    for line in lines:
+        chunk = compressor.compress(line.encode('utf-8'))
+        if chunk:
+            yield chunk
+    yield compressor.flush()
+
+def _drop_default_user_stats():
+    """Remove the stats row created at startup if nothing has touched it yet.
+
+    Every export carries the single UserStats row, which would otherwise
+    clash with the default one a new database starts with.
+    """
+    rows = UserStats.query.limit(2).all()
+    if len(rows) != 1 or DailyActivity.query.first():
+        return
+    stats = rows[0]
+    if (stats.quizzes_completed, stats.total_stars, stats.current_level, stats.current_streak) == (0, 0, 1, 0) \
+            and stats.last_quiz_date is None:
+        db.session.delete(stats)
+        db.session.flush()
+
+def import_records(lines, chunk_size=1000, replace=False):
+    """Insert NDJSON records in chunked bulk inserts, returning counts per type.
+
+    With replace=True the exported tables are emptied first; otherwise only
+    the untouched default stats row makes way for an imported one. Everything runs
+    in one transaction, so a bad record leaves the database untouched; only
+    the current chunk is held in memory. The activity rollup is re-derived
+    from the imported quizzes.
+    """
+    decoders = {record_type: _column_decoders(model) for record_type, model in EXPORT_MODELS.items()}
+    columns = {record_type: model.__table__.columns for record_type, model in EXPORT_MODELS.items()}
+    buffers = {record_type: [] for record_type in EXPORT_MODELS}
+    counts = {record_type: 0 for record_type in EXPORT_MODELS}
+
+    def flush(record_type):
+        rows = buffers[record_type]
+        if rows:
+            db.session.execute(insert(EXPORT_MODELS[record_type].__table__), rows)
+            counts[record_type] += len(rows)
+            buffers[record_type] = []
+
+    def normalize(record_type, data):
+        # executemany needs the same keys in every row, so fill out missing columns
+        unknown = set(data) - set(columns[record_type].keys())
+        if unknown:
+            raise ValueError(f"unknown columns {', '.join(sorted(unknown))}")
+        row = {}
+        for column in columns[record_type]:
+            value = data.get(column.name)
+            if value is None and not column.nullable and not column.primary_key:
+                raise ValueError(f"missing value for {column.name}")
+            if value is not None and column.name in decoders[record_type]:
+                value = decoders[record_type][column.name](value)
+            row[column.name] = value
+        return row
+
+    try:
+        if replace:
+            CourseDeletion.query.delete()
+            DailyActivity.query.delete()
+            for model in reversed(list(EXPORT_MODELS.values())):
+                model.query.delete()
+
+        for line_number, line in enumerate(lines, start=1):
+            if not line.strip():
+                continue
+            try:
+                record = json.loads(line)
+                record_type = record['type']
+                row = normalize(record_type, record['data'])
+            except (ValueError, KeyError, TypeError, AttributeError) as e:
+                raise ValueError(f"Invalid record on line {line_number}: {str(e)}")
+
+            if record_type == 'user_stats' and not replace and not counts['user_stats'] \
+                    and not buffers['user_stats']:
+                _drop_default_user_stats()
+
+            buffers[record_type].append(row)
+            if len(buffers[record_type]) >= chunk_size:
+                flush(record_type)
+
+        for record_type in EXPORT_MODELS:
+            flush(record_type)
+
+        bump_quota_generation()
+        rebuild_daily_activity()
+        db.session.commit()
+    except IntegrityError:
+        db.session.rollback()
+        if replace:
+            raise ValueError('Records conflict with each other, nothing was imported.')
+        raise ValueError('Records conflict with existing data, nothing was imported. '
+                         'Import into an empty database or use replace.')
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return counts
+
+def open_import_stream(fileobj):
+    """Wrap a binary stream in a gzip reader when it starts with the gzip magic bytes."""
+    stream = io.BufferedReader(fileobj) if not hasattr(fileobj, 'peek') else fileobj
+    if stream.peek(2)[:2] == b'\x1f\x8b':
+        return gzip.GzipFile(fileobj=stream)
+    return stream
+
+def purge_deleted_courses(batch_size=500, pause=0.05):
+    """Physically delete the rows of tombstoned courses, one small batch at a time.
+
+    Every batch is its own transaction so quiz submissions can take the
+    write lock in between. Progress is stored on the tombstone, so after a
+    crash the purge simply continues from what is left. Returns the number
+    of quizzes purged.
+    """
+    purged = 0
+    for deletion in CourseDeletion.query.filter(CourseDeletion.completed_at.is_(None)).order_by(CourseDeletion.id).all():
+        while True:
+            quiz_ids = [row.id for row in db.session.query(Quiz.id).filter(
+                Quiz.course_name == deletion.course_name,
+                Quiz.id <= deletion.max_quiz_id
+            ).limit(batch_size)]
+            if not quiz_ids:
+                break
+
+            QuizArchive.query.filter(QuizArchive.quiz_id.in_(quiz_ids)).delete(synchronize_session=False)
+            # Count what was actually deleted, another purger may have taken some rows already
+            deleted = Quiz.query.filter(Quiz.id.in_(quiz_ids)).delete(synchronize_session=False)
+            deletion.quizzes_purged += deleted
+            db.session.commit()
+            purged += deleted
+            if pause:
+                time.sleep(pause)
+
+        CompletedCourse.query.filter(
+            CompletedCourse.course_name == deletion.course_name,
+            CompletedCourse.id <= deletion.max_completed_course_id
+        ).delete(synchronize_session=False)
+        deletion.completed_at = datetime.utcnow()
+        db.session.commit()
+        print(f"Purged course {deletion.course_name} ({deletion.quizzes_purged} quizzes)")
+
+    return purged
+
+_purge_wakeup = threading.Event()
+_purge_thread = None
+_purge_thread_lock = threading.Lock()
+
+def _purge_loop():
+    while True:
+        _purge_wakeup.wait()
+        # Clear before purging so a deletion made during this pass triggers another one
+        _purge_wakeup.clear()
+        with app.app_context():
+            try:
+                purge_deleted_courses()
+            except Exception as e:
+                db.session.rollback()
+                print(f"Error purging deleted courses: {str(e)}")
+
+def start_purge_worker():
+    """Wake the background purge thread, starting it on first use."""
+    global _purge_thread
+    _purge_wakeup.set()
+    with _purge_thread_lock:
+        if _purge_thread is None or not _purge_thread.is_alive():
+            _purge_thread = threading.Thread(target=_purge_loop, name='course-purge', daemon=True)
+            _purge_thread.start()
+
+@app.cli.command('purge-deleted')
+@click.option('--batch-size', default=500, show_default=True, help='Quizzes deleted per transaction.')
+def purge_deleted_command(batch_size):
+    """Finish purging deleted courses in the foreground."""
+    click.echo(f"Purged {purge_deleted_courses(batch_size, pause=0)} quizzes")
+
+@app.cli.command('export-data')
+@click.argument('path', type=click.Path(dir_okay=False))
+@click.option('--gzip', 'use_gzip', is_flag=True, help='Compress the output (implied by a .gz path).')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows fetched per round trip.')
+def export_data_command(path, use_gzip, chunk_size):
+    """Export courses, quizzes and stats as NDJSON."""
+    opener = gzip.open if use_gzip or path.endswith('.gz') else open
+    lines = 0
+    with opener(path, 'wt', encoding='utf-8') as output:
+        for line in iter_export_lines(chunk_size):
+            output.write(line)
+            lines += 1
+    click.echo(f"Exported {lines} records to {path}")
+
+@app.cli.command('import-data')
+@click.argument('path', type=click.Path(exists=True, dir_okay=False))
+@click.option('--replace', is_flag=True, help='Delete existing data before importing.')
+@click.option('--chunk-size', default=1000, show_default=True, help='Rows per bulk insert.')
+def import_data_command(path, replace, chunk_size):
+    """Import an NDJSON export, optionally gzip compressed."""
+    with open(path, 'rb') as raw:
+        try:
+            counts = import_records(open_import_stream(raw), chunk_size, replace)
+        except ValueError as e:
+            raise click.ClickException(str(e))
+    click.echo(f"Imported {sum(counts.values())} records: {counts}")
+
+# Quiz generation prompts. Keep old versions around so their stats stay comparable.
+PROMPT_TEMPLATES = {
+    'v1': {
+        'structured': False,
+        'system': "You are a quiz generation expert. Generate challenging, scenario-based questions based on the provided course content.",
+        'user': """Generate a quiz about {topic} with the following specifications:
+        - Number of questions: {questions_per_quiz}
+        - Difficulty: Challenging
+        - Format: Multiple choice with 4 options
+        - Additional context: {additional_info}
+        
+        The quiz should be based on the following course details:
+        - Course Name: {course_name}
+        - Days to Complete: {days_to_complete}
+        - Quizzes per Day: {quizzes_per_day}
+        - Questions per Quiz: {questions_per_quiz}
+        
+        Please generate questions that are:
+        1. Based on the course content and additional information provided
+        2. Challenging but fair
+        3. Include real-world scenarios
+        4. Have clear, unambiguous answers
+        5. Test understanding rather than memorization
+        
+        Format each question as:
+        {{
+            "question": "Question text",
+            "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
+            "correct_answer": 0  // Index of correct answer (0-3)
+        }}
+        
+        Return the response as a JSON object with a "questions" array containing the questions.
+        """
+    },
+    'v2': {
+        'structured': True,
+        'system': "You write challenging, scenario-based multiple choice questions that test understanding, "
+                  "each with one unambiguous answer. Reply with JSON only: "
+                  '{"q":[{"t":question,"o":[4 options],"a":index of correct option}]}',
+        'user': "Topic: {topic}\nQuestions: {questions_per_quiz}\nContext: {additional_info}"
+    }
+}
+DEFAULT_PROMPT_VERSION = os.getenv('PROMPT_TEMPLATE_VERSION', 'v2')
+if DEFAULT_PROMPT_VERSION not in PROMPT_TEMPLATES:
+    raise ValueError(f"Unknown PROMPT_TEMPLATE_VERSION {DEFAULT_PROMPT_VERSION!r}. "
+                     f"Available versions: {', '.join(PROMPT_TEMPLATES)}")
+
+def build_prompt_messages(version, course, additional_info):
+    template = PROMPT_TEMPLATES[version]
+    user_prompt = template['user'].format(
+        topic=course.name,
+        course_name=course.name,
+        questions_per_quiz=course.questions_per_quiz,
+        days_to_complete=course.days_to_complete,
+        quizzes_per_day=course.quizzes_per_day,
+        additional_info=additional_info
+    )
+    return [
+        {"role": "system", "content": template['system']},
+        {"role": "user", "content": user_prompt}
+    ]
+
+def parse_quiz_response(content):
+    """Normalize a model reply into the question shape the frontend expects.
+
+    Accepts both the terse {"q": [{"t", "o", "a"}]} schema and the verbose
+    {"questions": [{"question", "options", "correct_answer"}]} one, and
+    tolerates text or code fences around the JSON. Malformed questions are
+    dropped; a ValueError is raised when none are usable.
+    """
+    try:
+        data = json.loads(content)
+    except (TypeError, json.JSONDecodeError):
+        start, end = (content or '').find('{'), (content or '').rfind('}')
+        if start == -1 or end <= start:
+            raise ValueError('Reply does not contain a JSON object')
+        data = json.loads(content[start:end + 1])
+
+    if not isinstance(data, (dict, list)):
+        raise ValueError('Reply is not a JSON object')
+
+    items = data if isinstance(data, list) else data.get('q', data.get('questions', []))
+    if not isinstance(items, list):
+        raise ValueError('Reply does not contain a list of questions')
+
+    questions = []
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        text_value = item.get('t', item.get('question'))
+        options = item.get('o', item.get('options'))
+        answer = item.get('a', item.get('correct_answer'))
+        if isinstance(answer, str) and answer.strip().isdigit():
+            answer = int(answer)
+
+        if not isinstance(text_value, str) or not text_value.strip():
+            continue
+        if not isinstance(options, list) or len(options) != 4 or not all(isinstance(option, str) for option in options):
+            continue
+        if not isinstance(answer, int) or isinstance(answer, bool) or not 0 <= answer < 4:
+            continue
+
+        questions.append({'question': text_value, 'options': options, 'correct_answer': answer})
+
+    if not questions:
+        raise ValueError('Reply contains no valid questions')
+    return questions
+
+def record_prompt_usage(version, prompt_tokens, completion_tokens, questions, parse_failed):
+    """Atomically add one generation call to the stats row of a template version."""
+    increment = update(PromptStats).where(PromptStats.version == version).values(
+        calls=PromptStats.calls + 1,
+        parse_failures=PromptStats.parse_failures + (1 if parse_failed else 0),
+        questions=PromptStats.questions + questions,
+        prompt_tokens=PromptStats.prompt_tokens + prompt_tokens,
+        completion_tokens=PromptStats.completion_tokens + completion_tokens
+    ).execution_options(synchronize_session=False)
+
+    if db.session.execute(increment).rowcount:
+        return
+
+    try:
+        with db.session.begin_nested():
+            db.session.add(PromptStats(
+                version=version,
+                calls=1,
+                parse_failures=1 if parse_failed else 0,
+                questions=questions,
+                prompt_tokens=prompt_tokens,
+                completion_tokens=completion_tokens
+            ))
+    except IntegrityError:
+        db.session.execute(increment)
+
+# Output of `flask build-assets`: fingerprinted JS/CSS and the HTML shells that reference them
+ASSET_DIST_DIR = os.path.join(app.static_folder, 'dist')
+BUILT_TEMPLATE_DIR = os.path.join(app.template_folder, 'dist')
+PAGE_TEMPLATES = ('index.html', 'quiz.html')
+# Fingerprints stay this long after a build superseded them, for pages still
+# cached by browsers or other workers. Supersede times are kept in a manifest.
+ASSET_RETENTION_SECONDS = 7 * 24 * 3600
+SUPERSEDED_MANIFEST = '.superseded.json'
+INLINE_ASSET_PATTERN = re.compile(r'<(style|script)>(.*?)</\1>', re.DOTALL)
+
+def _write_fingerprinted(dist_dir, stem, extension, content):
+    data = content.encode('utf-8')
+    filename = f"{stem}.{hashlib.sha256(data).hexdigest()[:12]}.{extension}"
+    path = os.path.join(dist_dir, filename)
+    with open(path, 'wb') as output:
+        output.write(data)
+    with open(path + '.gz', 'wb') as output:
+        output.write(gzip.compress(data, compresslevel=9, mtime=0))
+    if brotli:
+        with open(path + '.br', 'wb') as output:
+            output.write(brotli.compress(data))
+    return filename
+
+def build_assets(dist_dir=None, built_template_dir=None):
+    """Move inline <style> and <script> blocks of the page templates into static files.
+
+    Each block becomes a content-hashed file with .gz (and .br when brotli
+    is installed) siblings, and a copy of the template referencing those
+    files is written next to the originals. Files from earlier builds are
+    kept for ASSET_RETENTION_SECONDS so shells already served keep working.
+    Returns {template: [filenames]}.
+    """
+    dist_dir = dist_dir or ASSET_DIST_DIR
+    built_template_dir = built_template_dir or BUILT_TEMPLATE_DIR
+    os.makedirs(dist_dir, exist_ok=True)
+    os.makedirs(built_template_dir, exist_ok=True)
+
+    built = {}
+    for template_name in PAGE_TEMPLATES:
+        with open(os.path.join(app.template_folder, template_name), encoding='utf-8') as source:
+            html = source.read()
+
+        stem = os.path.splitext(template_name)[0]
+        filenames = []
+
+        def extract(match):
+            tag, content = match.groups()
+            extension = 'css' if tag == 'style' else 'js'
+            filename = _write_fingerprinted(dist_dir, stem, extension, content)
+            filenames.append(filename)
+            if tag == 'style':
+                return f'<link href="/static/dist/{filename}" rel="stylesheet">'
+            return f'<script src="/static/dist/{filename}"></script>'
+
+        # Swap the shell in atomically so a running server never reads half of it
+        shell_path = os.path.join(built_template_dir, template_name)
+        with open(shell_path + '.tmp', 'w', encoding='utf-8') as output:
+            output.write(INLINE_ASSET_PATTERN.sub(extract, html))
+        os.replace(shell_path + '.tmp', shell_path)
+        built[template_name] = filenames
+
+    manifest_path = os.path.join(dist_dir, SUPERSEDED_MANIFEST)
+    superseded = {}
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding='utf-8') as manifest:
+            superseded = json.load(manifest)
+
+    current = {filename for filenames in built.values() for filename in filenames}
+    now = time.time()
+    for name in os.listdir(dist_dir):
+        if name.startswith('.'):
+            continue
+        # Strip the .gz/.br suffix of precompressed variants to get the asset name
+        asset_name = '.'.join(name.split('.')[:3])
+        if asset_name in current:
+            continue
+        if now - superseded.setdefault(asset_name, now) > ASSET_RETENTION_SECONDS:
+            os.remove(os.path.join(dist_dir, name))
+
+    remaining = {'.'.join(name.split('.')[:3]) for name in os.listdir(dist_dir)}
+    with open(manifest_path, 'w', encoding='utf-8') as manifest:
+        json.dump({name: at for name, at in superseded.items() if name in remaining and name not in current},
+                  manifest, indent=2)
+
+    return built
+
+@app.cli.command('build-assets')
+def build_assets_command():
+    """Extract inline JS/CSS from the templates into precompressed static files."""
+    for template_name, filenames in build_assets().items():
+        click.echo(f"{template_name}: {', '.join(filenames)}")
+
+_page_cache = {}
+
+def render_page(template_name):
+    """Serve a page shell, rendered once and revalidated with its ETag.
+
+    Uses the built shell when `flask build-assets` has been run. The cached
+    copy is re-rendered when the file it came from changes, e.g. after a new
+    build, and skipped entirely when TEMPLATES_AUTO_RELOAD is set.
+    """
+    built_path = os.path.join(BUILT_TEMPLATE_DIR, template_name)
+    path = built_path if os.path.exists(built_path) else os.path.join(app.template_folder, template_name)
+    mtime = os.stat(path).st_mtime_ns
+
+    cached = _page_cache.get(template_name)
+    if cached is None or cached[0] != mtime or app.config['TEMPLATES_AUTO_RELOAD']:
+        if path == built_path:
+            with open(built_path, encoding='utf-8') as source:
+                body = render_template_string(source.read()).encode('utf-8')
+        else:
+            body = render_template(template_name).encode('utf-8')
+        cached = (mtime, body, gzip.compress(body, mtime=0), hashlib.sha256(body).hexdigest()[:16])
+        _page_cache[template_name] = cached
+
+    _, body, compressed_body, etag = cached
+    response = Response(mimetype='text/html')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.vary.add('Accept-Encoding')
+    if 'gzip' in request.accept_encodings:
+        response.set_data(compressed_body)
+        response.headers['Content-Encoding'] = 'gzip'
+        response.set_etag(f'{etag}-gzip')
+    else:
+        response.set_data(body)
+        response.set_etag(etag)
+    return response.make_conditional(request)
+
+@app.route('/static/dist/<path:filename>')
+def dist_asset(filename):
+    path = safe_join(ASSET_DIST_DIR, filename)
+    if path is None or os.path.basename(filename).startswith('.') or not os.path.isfile(path):
+        abort(404)
+
+    # Serve the precompressed variant the client accepts, the ETag differs per variant
+    encoding = None
+    if brotli and 'br' in request.accept_encodings and os.path.isfile(path + '.br'):
+        encoding = 'br'
+    elif 'gzip' in request.accept_encodings and os.path.isfile(path + '.gz'):
+        encoding = 'gzip'
+
+    response = send_file(
+        path + {'br': '.br', 'gzip': '.gz'}[encoding] if encoding else path,
+        mimetype=mimetypes.guess_type(filename)[0],
+        conditional=True,
+        etag=True,
+        max_age=31536000
+    )
+    if encoding:
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    # File names change with their content, so browsers never need to revalidate
+    response.headers['Cache-Control'] = 'public, max-age=31536000, immutable'
+    return response
+
 @app.route('/')
 def index():
-    return render_template('index.html')
+    return render_page('index.html')
 
 @app.route('/api/generate-quiz', methods=['POST'])
 def generate_quiz():
@@ -105,6 +1093,11 @@ def generate_quiz():
         if not topic:
             return jsonify({'error': 'Topic is required'}), 400
             
+        # Reject from the in-memory counters when the limit is already known to be hit
+        today = datetime.utcnow().date()
+        if daily_quota.is_exhausted(topic, today):
+            return jsonify({'error': 'Daily quiz limit reached. You have already completed your quizzes for today.'}), 429
+            
         # Get course details
         course = Course.query.filter_by(name=topic).first()
         if not course:
@@ -121,78 +1114,56 @@ def generate_quiz():
             db.session.commit()
             
         # Check daily quiz limit
-        today = datetime.utcnow().date()
-        completed_today = Quiz.query.filter(
-            Quiz.course_name == topic,
-            Quiz.completed == True,
-            Quiz.completed_date == today
-        ).count()
+        daily_quota.set_limit(topic, course.quizzes_per_day)
+        completed_today = daily_quota.completed_today(topic, today)
         
         if completed_today >= course.quizzes_per_day:
             return jsonify({'error': 'Daily quiz limit reached. You have already completed your quizzes for today.'}), 429
             
-        # Create a more specific prompt using course details
-        prompt = f"""Generate a quiz about {topic} with the following specifications:
-        - Number of questions: {course.questions_per_quiz}
-        - Difficulty: Challenging
-        - Format: Multiple choice with 4 options
-        - Additional context: {additional_info}
-        
-        The quiz should be based on the following course details:
-        - Course Name: {course.name}
-        - Days to Complete: {course.days_to_complete}
-        - Quizzes per Day: {course.quizzes_per_day}
-        - Questions per Quiz: {course.questions_per_quiz}
+        prompt_version = data.get('promptVersion', DEFAULT_PROMPT_VERSION)
+        if prompt_version not in PROMPT_TEMPLATES:
+            return jsonify({'error': f'Unknown prompt version: {prompt_version}'}), 400
         
-        Please generate questions that are:
-        1. Based on the course content and additional information provided
-        2. Challenging but fair
-        3. Include real-world scenarios
-        4. Have clear, unambiguous answers
-        5. Test understanding rather than memorization
-        
-        Format each question as:
-        {{
-            "question": "Question text",
-            "options": ["Option 1", "Option 2", "Option 3", "Option 4"],
-            "correct_answer": 0  // Index of correct answer (0-3)
-        }}
-        
-        Return the response as a JSON object with a "questions" array containing the questions.
-        """
+        request_options = {}
+        if PROMPT_TEMPLATES[prompt_version]['structured']:
+            request_options['response_format'] = {"type": "json_object"}
         
         response = openai.chat.completions.create(
             model="gpt-3.5-turbo",
-            messages=[
-                {"role": "system", "content": "You are a quiz generation expert. Generate challenging, scenario-based questions based on the provided course content."},
-                {"role": "user", "content": prompt}
-            ],
+            messages=build_prompt_messages(prompt_version, course, additional_info),
             temperature=0.7,
-            max_tokens=2000
+            max_tokens=2000,
+            **request_options
         )
+        usage = response.usage
+        prompt_tokens = usage.prompt_tokens if usage else 0
+        completion_tokens = usage.completion_tokens if usage else 0
         
         # Parse the response
         try:
-            quiz_data = json.loads(response.choices[0].message.content)
-            questions = quiz_data.get('questions', [])
-            
-            # Store the quiz in the database
-            quiz = Quiz(
-                course_name=course.name,
-                questions=json.dumps(questions),
-                created_at=datetime.utcnow()
-            )
-            db.session.add(quiz)
+            questions = parse_quiz_response(response.choices[0].message.content)
+        except ValueError as parse_error:
+            print(f"Error parsing quiz ({prompt_version}): {str(parse_error)}")
+            record_prompt_usage(prompt_version, prompt_tokens, completion_tokens, 0, parse_failed=True)
             db.session.commit()
-            
-            return jsonify({
-                'success': True,
-                'quiz': questions,
-                'quiz_id': quiz.id
-            })
-            
-        except json.JSONDecodeError:
             return jsonify({'error': 'Failed to parse quiz data'}), 500
+        
+        record_prompt_usage(prompt_version, prompt_tokens, completion_tokens, len(questions), parse_failed=False)
+        
+        # Store the quiz in the database
+        quiz = Quiz(
+            course_name=course.name,
+            questions=json.dumps(questions),
+            created_at=datetime.utcnow()
+        )
+        db.session.add(quiz)
+        db.session.commit()
+        
+        return jsonify({
+            'success': True,
+            'quiz': questions,
+            'quiz_id': quiz.id
+        })
             
     except Exception as e:
         print(f"Error generating quiz: {str(e)}")
@@ -209,13 +1180,16 @@ def complete_quiz():
                 db.session.add(user_stats)
                 db.session.commit()
             
+            current_streak, longest_streak = compute_streaks(get_active_days(user_stats.id), datetime.utcnow().date())
+            
             return jsonify({
                 'current_level': user_stats.current_level,
                 'level_name': user_stats.get_level_name(),
                 'quizzes_completed': user_stats.quizzes_completed,
                 'next_level_requirement': user_stats.get_next_level_requirement(),
                 'total_stars': user_stats.total_stars,
-                'current_streak': user_stats.current_streak
+                'current_streak': current_streak,
+                'longest_streak': longest_streak
             })
         except Exception as e:
             print(f"Error getting user stats: {str(e)}")
@@ -234,7 +1208,7 @@ def complete_quiz():
             if not quiz_id:
                 return jsonify({'error': 'Quiz ID is required'}), 400
             
-            quiz = Quiz.query.get(quiz_id)
+            quiz = Quiz.query.filter(Quiz.id == quiz_id, not_deleted(Quiz)).first()
             if not quiz:
                 return jsonify({'error': 'Quiz not found'}), 404
             
@@ -244,6 +1218,11 @@ def complete_quiz():
             quizzes_per_day = course_details.get('quizzesPerDay', 1)
             total_required_quizzes = days_to_complete * quizzes_per_day
             
+            # A quiz completed again replaces its earlier contribution to the rollup
+            previous_completion = None
+            if quiz.completed and quiz.completed_date:
+                previous_completion = (quiz.completed_date, quiz.score or 0, quiz.total_questions or 0)
+            
             # Update quiz with completion data
             quiz.completed = True
             quiz.score = correct_answers
@@ -252,9 +1231,10 @@ def complete_quiz():
             quiz.completed_date = datetime.utcnow().date()
             
             # Get all completed quizzes for this course
-            completed_quizzes = Quiz.query.filter_by(
-                course_name=course_name,
-                completed=True
+            completed_quizzes = Quiz.query.filter(
+                Quiz.course_name == course_name,
+                Quiz.completed == True,
+                not_deleted(Quiz)
             ).all()
             
             total_completed = len(completed_quizzes)
@@ -262,8 +1242,9 @@ def complete_quiz():
             total_questions_answered = sum(q.total_questions or 0 for q in completed_quizzes)
             
             # Check if course already exists in CompletedCourse
-            existing_completed_course = CompletedCourse.query.filter_by(
-                course_name=course_name
+            existing_completed_course = CompletedCourse.query.filter(
+                CompletedCourse.course_name == course_name,
+                not_deleted(CompletedCourse)
             ).first()
             
             is_course_completed = total_completed >= total_required_quizzes and not existing_completed_course
@@ -292,10 +1273,33 @@ def complete_quiz():
             if not user_stats:
                 user_stats = UserStats()
                 db.session.add(user_stats)
+                db.session.flush()
             
             # Update user stats
+            stars_earned = 5 + correct_answers  # Base stars + correct answers
             user_stats.quizzes_completed += 1
-            user_stats.total_stars += (5 + correct_answers)  # Base stars + correct answers
+            user_stats.total_stars += stars_earned
+            
+            # Roll the quiz up into today's activity
+            if previous_completion:
+                previous_day, previous_score, previous_total = previous_completion
+                record_daily_activity(
+                    user_id=user_stats.id,
+                    day=previous_day,
+                    course_name=quiz.course_name,
+                    correct_answers=-previous_score,
+                    total_questions=-previous_total,
+                    stars_earned=-(5 + previous_score),
+                    quizzes_completed=-1
+                )
+            record_daily_activity(
+                user_id=user_stats.id,
+                day=quiz.completed_date,
+                course_name=quiz.course_name,
+                correct_answers=correct_answers,
+                total_questions=total_questions,
+                stars_earned=stars_earned
+            )
             
             # Update streak
             current_date = datetime.utcnow()
@@ -332,6 +1336,9 @@ def complete_quiz():
                 db.session.rollback()
                 raise commit_error
             
+            if not previous_completion or previous_completion[0] != quiz.completed_date:
+                daily_quota.record_completion(quiz.course_name, quiz.completed_date)
+            
             return jsonify({
                 'message': 'Quiz completed successfully',
                 'score': score,
@@ -346,9 +1353,62 @@ def complete_quiz():
             print(f"Error completing quiz: {str(e)}")
             return jsonify({'error': str(e)}), 500
 
+@app.route('/api/prompt-stats', methods=['GET'])
+def get_prompt_stats():
+    try:
+        stats_data = []
+        for stats in PromptStats.query.order_by(PromptStats.version).all():
+            stats_data.append({
+                'version': stats.version,
+                'calls': stats.calls,
+                'questions': stats.questions,
+                'parseFailures': stats.parse_failures,
+                'parseFailureRate': stats.parse_failures / stats.calls if stats.calls else 0,
+                'promptTokensPerQuestion': stats.prompt_tokens / stats.questions if stats.questions else None,
+                'completionTokensPerQuestion': stats.completion_tokens / stats.questions if stats.questions else None
+            })
+        return jsonify({'defaultVersion': DEFAULT_PROMPT_VERSION, 'versions': stats_data})
+    except Exception as e:
+        print(f"Error getting prompt stats: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/quiz')
 def quiz():
-    return render_template('quiz.html')
+    return render_page('quiz.html')
+
+@app.route('/api/quizzes/<int:quiz_id>', methods=['GET'])
+def get_quiz(quiz_id):
+    try:
+        quiz = Quiz.query.filter(Quiz.id == quiz_id, not_deleted(Quiz)).first()
+        if not quiz:
+            return jsonify({'error': 'Quiz not found'}), 404
+
+        questions = load_questions(quiz.questions)
+        user_answers = quiz.user_answers
+        if quiz.archived_at:
+            archive = QuizArchive.query.filter_by(quiz_id=quiz.id).first()
+            if archive:
+                payload = archive.get_payload()
+                questions = payload['questions']
+                # Answers from a completion after archiving are newer than the archived ones
+                if user_answers is None:
+                    user_answers = payload['user_answers']
+
+        return jsonify({
+            'id': quiz.id,
+            'courseName': quiz.course_name,
+            'questions': questions,
+            'userAnswers': user_answers,
+            'completed': quiz.completed,
+            'score': quiz.score,
+            'totalQuestions': quiz.total_questions,
+            'completedDate': quiz.completed_date.isoformat() if quiz.completed_date else None,
+            'createdAt': quiz.created_at.isoformat() if quiz.created_at else None,
+            'archived': quiz.archived_at is not None
+        })
+    except Exception as e:
+        print(f"Error getting quiz: {str(e)}")
+        return jsonify({'error': str(e)}), 500
 
 @app.route('/api/completed-courses', methods=['GET', 'DELETE'])
 def get_completed_courses():
@@ -359,14 +1419,27 @@ def get_completed_courses():
             if not course_name:
                 return jsonify({'error': 'Course name is required'}), 400
 
-            # Delete completed course and all its quizzes
-            CompletedCourse.query.filter_by(course_name=course_name).delete()
-            Quiz.query.filter_by(course_name=course_name).delete()
+            # Tombstone the course, its quizzes are purged in the background
+            deletion = CourseDeletion(
+                course_name=course_name,
+                max_quiz_id=db.session.query(func.max(Quiz.id)).filter(Quiz.course_name == course_name).scalar() or 0,
+                max_completed_course_id=db.session.query(func.max(CompletedCourse.id)).filter(
+                    CompletedCourse.course_name == course_name
+                ).scalar() or 0,
+                quizzes_total=Quiz.query.filter(Quiz.course_name == course_name, not_deleted(Quiz)).count()
+            )
+            db.session.add(deletion)
+            retire_course_activity(course_name)
+            bump_quota_generation()
             db.session.commit()
-            return jsonify({'message': 'Course deleted successfully'})
+            daily_quota.forget(course_name)
+
+            if not app.testing:
+                start_purge_worker()
+            return jsonify({'message': 'Course deleted successfully', 'deletion_id': deletion.id})
 
         # Handle GET request
-        completed_courses = CompletedCourse.query.all()
+        completed_courses = CompletedCourse.query.filter(not_deleted(CompletedCourse)).all()
         print(f"Found {len(completed_courses)} completed courses")
         
         courses_data = []
@@ -395,6 +1468,89 @@ def get_completed_courses():
         print(f"Error handling completed courses: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/activity/streaks', methods=['GET'])
+def get_activity_streaks():
+    try:
+        user_stats = UserStats.query.first()
+        if not user_stats:
+            return jsonify({'current_streak': 0, 'longest_streak': 0, 'active_days': 0, 'last_active_date': None})
+
+        active_days = get_active_days(user_stats.id)
+        current_streak, longest_streak = compute_streaks(active_days, datetime.utcnow().date())
+
+        return jsonify({
+            'current_streak': current_streak,
+            'longest_streak': longest_streak,
+            'active_days': len(active_days),
+            'last_active_date': active_days[-1].isoformat() if active_days else None
+        })
+    except Exception as e:
+        print(f"Error getting streaks: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/activity/calendar', methods=['GET'])
+def get_activity_calendar():
+    try:
+        today = datetime.utcnow().date()
+        try:
+            end = date.fromisoformat(request.args['end']) if request.args.get('end') else today
+            start = date.fromisoformat(request.args['start']) if request.args.get('start') else end - timedelta(days=364)
+        except ValueError:
+            return jsonify({'error': 'Dates must be in YYYY-MM-DD format'}), 400
+
+        if start > end:
+            return jsonify({'error': 'Start date must not be after end date'}), 400
+
+        query = db.session.query(
+            DailyActivity.day,
+            func.sum(DailyActivity.quizzes_completed),
+            func.sum(DailyActivity.correct_answers),
+            func.sum(DailyActivity.total_questions),
+            func.sum(DailyActivity.stars_earned)
+        ).filter(DailyActivity.day >= start, DailyActivity.day <= end)
+
+        course_name = request.args.get('course')
+        if course_name:
+            query = query.filter(DailyActivity.course_name == course_name)
+
+        days_data = [{
+            'date': day.isoformat(),
+            'quizzesCompleted': quizzes,
+            'correctAnswers': correct,
+            'totalQuestions': questions,
+            'starsEarned': stars
+        } for day, quizzes, correct, questions, stars in query.group_by(DailyActivity.day).order_by(DailyActivity.day)]
+
+        return jsonify({
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'days': days_data
+        })
+    except Exception as e:
+        print(f"Error getting activity calendar: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
+@app.route('/api/course-deletions', methods=['GET'])
+def get_course_deletions():
+    try:
+        deletions_data = []
+        for deletion in CourseDeletion.query.order_by(CourseDeletion.id.desc()).all():
+            deletions_data.append({
+                'id': deletion.id,
+                'courseName': deletion.course_name,
+                'requestedAt': deletion.requested_at.isoformat(),
+                'completedAt': deletion.completed_at.isoformat() if deletion.completed_at else None,
+                'quizzesTotal': deletion.quizzes_total,
+                'quizzesPurged': deletion.quizzes_purged,
+                'progress': 1 if deletion.completed_at else (
+                    deletion.quizzes_purged / deletion.quizzes_total if deletion.quizzes_total else 0
+                )
+            })
+        return jsonify(deletions_data)
+    except Exception as e:
+        print(f"Error getting course deletions: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 @app.route('/api/courses', methods=['POST'])
 def create_course():
     try:
@@ -476,10 +1632,41 @@ def create_course():
         print(f"Error creating course: {str(e)}")
         return jsonify({'error': str(e)}), 500
 
+@app.route('/api/export', methods=['GET'])
+def export_data():
+    lines = iter_export_lines()
+    if request.args.get('gzip'):
+        return Response(
+            stream_with_context(iter_gzip(lines)),
+            mimetype='application/gzip',
+            headers={'Content-Disposition': 'attachment; filename=studystreak-export.ndjson.gz'}
+        )
+    return Response(
+        stream_with_context(lines),
+        mimetype='application/x-ndjson',
+        headers={'Content-Disposition': 'attachment; filename=studystreak-export.ndjson'}
+    )
+
+@app.route('/api/import', methods=['POST'])
+def import_data():
+    try:
+        replace = request.args.get('replace') in ('1', 'true')
+        counts = import_records(open_import_stream(request.stream), replace=replace)
+        # Other workers drop their counts at their next generation check
+        daily_quota.reset()
+        return jsonify({'message': 'Import completed successfully', 'imported': counts})
+    except ValueError as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        db.session.rollback()
+        print(f"Error importing data: {str(e)}")
+        return jsonify({'error': str(e)}), 500
+
 # Initialize database
 with app.app_context():
     # Create tables if they don't exist
     db.create_all()
+    ensure_schema()
     
     # Check if default user stats exist
     if not UserStats.query.first():
@@ -494,6 +1681,20 @@ with app.app_context():
         db.session.add(default_stats)
         db.session.commit()
         print("Created default user stats")
+    
+    # Resume purging courses whose deletion was interrupted. Under `python app.py`
+    # this also runs in the debug reloader's watcher process, which must not purge
+    serving_process = __name__ != '__main__' or os.environ.get('WERKZEUG_RUN_MAIN') == 'true'
+    if serving_process and not app.testing and CourseDeletion.query.filter(CourseDeletion.completed_at.is_(None)).first():
+        start_purge_worker()
+    
+    # Backfill the activity rollup for databases created before it existed
+    if not DailyActivity.query.first() and Quiz.query.filter_by(completed=True).first():
+        print(f"Rebuilt {rebuild_daily_activity()} daily activity rows")
 
 if __name__ == '__main__':
+    # With the debug reloader only the child process serves requests
+    compaction_interval = os.getenv('COMPACTION_INTERVAL_HOURS')
+    if compaction_interval and os.environ.get('WERKZEUG_RUN_MAIN') == 'true':
+        start_compaction_scheduler(float(compaction_interval))
     app.run(host='127.0.0.1', port=4444, debug=True) 
\ No newline at end of file
@@ -1,5 +1,5 @@
 import unittest
-from app import app, db, Quiz, UserStats, Course
+from app import app, db, Quiz, UserStats, Course, daily_quota, rebuild_daily_activity
 from datetime import datetime, timedelta
 import json
 
@@ -12,6 +12,7 @@ class TestStudyApp(unittest.TestCase):
         self.app_context = app.app_context()
         self.app_context.push()
         db.create_all()
+        daily_quota.reset()
 
     def tearDown(self):
         """Clean up after tests"""
@@ -126,6 +127,8 @@ class TestStudyApp(unittest.TestCase):
         )
         db.session.add(quiz)
         db.session.commit()
+        # The quota reads the daily activity rollup, so roll up the inserted quiz
+        rebuild_daily_activity()
 
         # Test data
         test_data = {
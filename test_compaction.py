@@ -0,0 +1,129 @@
+import unittest
+from app import app, db, Quiz, CompletedCourse, QuizArchive, run_compaction
+from sqlalchemy import text
+from datetime import datetime
+import json
+
+QUESTIONS = [
+    {"question": "What is 2 + 2?", "options": ["3", "4", "5", "6"], "correct_answer": 1},
+    {"question": "What is 3 + 3?", "options": ["6", "7", "8", "9"], "correct_answer": 0}
+]
+
+class TestCompaction(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        for course_name in ('Finished Course', 'Active Course'):
+            db.session.add(Quiz(
+                questions=json.dumps(QUESTIONS),
+                course_name=course_name,
+                completed=True,
+                score=1,
+                total_questions=2,
+                user_answers=[1, 2],
+                completed_date=datetime.utcnow().date()
+            ))
+        db.session.add(CompletedCourse(
+            course_name='Finished Course',
+            completion_date=datetime.utcnow(),
+            total_score=1,
+            total_questions=2,
+            days_to_complete=1,
+            quizzes_completed=1,
+            quizzes_per_day=1
+        ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_archives_completed_courses_only(self):
+        report = run_compaction()
+        self.assertEqual(report['quizzes_archived'], 1)
+        self.assertGreaterEqual(report['bytes_reclaimed'], 0)
+
+        finished = Quiz.query.filter_by(course_name='Finished Course').first()
+        active = Quiz.query.filter_by(course_name='Active Course').first()
+        self.assertEqual(finished.questions, [])
+        self.assertIsNone(finished.user_answers)
+        self.assertEqual(finished.score, 1)
+        self.assertIsNotNone(finished.archived_at)
+        self.assertIsNone(active.archived_at)
+
+        archive = QuizArchive.query.filter_by(quiz_id=finished.id).first()
+        self.assertEqual(archive.answer_key, [1, 0])
+        self.assertEqual(archive.get_payload()['questions'], QUESTIONS)
+
+        # Running again has nothing left to archive
+        self.assertEqual(run_compaction(vacuum=False)['quizzes_archived'], 0)
+
+    def test_archived_quiz_is_retrievable(self):
+        quiz_id = Quiz.query.filter_by(course_name='Finished Course').first().id
+        run_compaction(vacuum=False)
+
+        response = self.client.get(f'/api/quizzes/{quiz_id}')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertTrue(data['archived'])
+        self.assertEqual(data['questions'], QUESTIONS)
+        self.assertEqual(data['userAnswers'], [1, 2])
+
+    def test_vacuum_empties_free_list(self):
+        run_compaction()
+
+        # Archive a second, larger course so the incremental path has pages to free
+        for _ in range(200):
+            db.session.add(Quiz(
+                questions=json.dumps(QUESTIONS * 50),
+                course_name='Second Course',
+                completed=True,
+                user_answers=list(range(100)),
+                completed_date=datetime.utcnow().date()
+            ))
+        db.session.add(CompletedCourse(
+            course_name='Second Course',
+            completion_date=datetime.utcnow(),
+            total_score=0,
+            total_questions=0,
+            days_to_complete=1,
+            quizzes_completed=200,
+            quizzes_per_day=1
+        ))
+        db.session.commit()
+
+        report = run_compaction()
+        self.assertEqual(report['quizzes_archived'], 200)
+        self.assertGreater(report['bytes_reclaimed'], 4096)
+        self.assertEqual(db.session.execute(text('PRAGMA freelist_count')).scalar(), 0)
+
+    def test_recompleted_archived_quiz_returns_new_answers(self):
+        quiz_id = Quiz.query.filter_by(course_name='Finished Course').first().id
+        run_compaction(vacuum=False)
+
+        self.client.post('/api/complete-quiz', json={
+            'quiz_id': quiz_id,
+            'answers': [3, 3],
+            'correct_answers': 0,
+            'totalQuestions': 2,
+            'course_name': 'Finished Course',
+            'course_details': {'daysToComplete': 1, 'quizzesPerDay': 1}
+        })
+
+        data = json.loads(self.client.get(f'/api/quizzes/{quiz_id}').data)
+        self.assertEqual(data['userAnswers'], [3, 3])
+        self.assertEqual(data['questions'], QUESTIONS)
+
+    def test_compact_command(self):
+        result = app.test_cli_runner().invoke(args=['compact', '--no-vacuum'])
+        self.assertEqual(result.exit_code, 0)
+        self.assertIn('Archived 1 quizzes', result.output)
+
+if __name__ == '__main__':
+    unittest.main()
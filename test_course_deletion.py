@@ -0,0 +1,125 @@
+import unittest
+from unittest import mock
+from app import app, db, Quiz, CompletedCourse, CourseDeletion, UserStats, DailyActivity, daily_quota, purge_deleted_courses
+from datetime import datetime, timedelta
+import json
+
+class TestCourseDeletion(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        daily_quota.reset()
+
+        for i in range(5):
+            self.add_quiz('Test Course')
+        self.add_quiz('Other Course')
+        db.session.add(CompletedCourse(
+            course_name='Test Course',
+            completion_date=datetime.utcnow(),
+            total_score=5,
+            total_questions=5,
+            days_to_complete=5,
+            quizzes_completed=5,
+            quizzes_per_day=1
+        ))
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def add_quiz(self, course_name):
+        quiz = Quiz(
+            questions=[{"question": "Test", "options": ["A", "B", "C", "D"], "correct_answer": 0}],
+            course_name=course_name,
+            completed=True,
+            score=1,
+            total_questions=1,
+            completed_date=datetime.utcnow().date()
+        )
+        db.session.add(quiz)
+        db.session.commit()
+        return quiz
+
+    def delete_course(self):
+        return self.client.delete('/api/completed-courses', json={'name': 'Test Course'})
+
+    def test_deleted_course_is_hidden_immediately(self):
+        quiz_id = Quiz.query.filter_by(course_name='Test Course').first().id
+        response = self.delete_course()
+        self.assertEqual(response.status_code, 200)
+
+        # Rows are still there until purged, but no endpoint sees them
+        self.assertEqual(Quiz.query.filter_by(course_name='Test Course').count(), 5)
+        self.assertEqual(json.loads(self.client.get('/api/completed-courses').data), [])
+        self.assertEqual(self.client.get(f'/api/quizzes/{quiz_id}').status_code, 404)
+
+        deletions = json.loads(self.client.get('/api/course-deletions').data)
+        self.assertEqual(deletions[0]['quizzesTotal'], 5)
+        self.assertEqual(deletions[0]['progress'], 0)
+
+    def test_deleted_course_keeps_streak_days(self):
+        user_stats = UserStats()
+        db.session.add(user_stats)
+        db.session.commit()
+        today = datetime.utcnow().date()
+        for days_ago, course_name in ((0, 'Test Course'), (1, 'Test Course'), (1, 'Other Course')):
+            db.session.add(DailyActivity(
+                user_id=user_stats.id,
+                day=today - timedelta(days=days_ago),
+                course_name=course_name,
+                quizzes_completed=1
+            ))
+        db.session.commit()
+
+        self.delete_course()
+
+        streaks = json.loads(self.client.get('/api/activity/streaks').data)
+        self.assertEqual(streaks['current_streak'], 2)
+        calendar = json.loads(self.client.get('/api/activity/calendar').data)
+        self.assertEqual([day['quizzesCompleted'] for day in calendar['days']], [2, 1])
+        calendar = json.loads(self.client.get('/api/activity/calendar?course=Test Course').data)
+        self.assertEqual(calendar['days'], [])
+        self.assertEqual(daily_quota.completed_today('Test Course', today), 0)
+
+    def test_recreated_course_stays_visible(self):
+        self.delete_course()
+        quiz = self.add_quiz('Test Course')
+
+        self.assertEqual(self.client.get(f'/api/quizzes/{quiz.id}').status_code, 200)
+        purge_deleted_courses(pause=0)
+        self.assertEqual(Quiz.query.filter_by(course_name='Test Course').all(), [quiz])
+
+    def test_purge_in_batches(self):
+        self.delete_course()
+        self.assertEqual(purge_deleted_courses(batch_size=2, pause=0), 5)
+
+        self.assertEqual(Quiz.query.filter_by(course_name='Test Course').count(), 0)
+        self.assertEqual(Quiz.query.filter_by(course_name='Other Course').count(), 1)
+        self.assertEqual(CompletedCourse.query.count(), 0)
+
+        deletions = json.loads(self.client.get('/api/course-deletions').data)
+        self.assertEqual(deletions[0]['quizzesPurged'], 5)
+        self.assertEqual(deletions[0]['progress'], 1)
+
+    def test_purge_resumes_after_crash(self):
+        self.delete_course()
+        with mock.patch('app.time.sleep', side_effect=RuntimeError('crash')):
+            with self.assertRaises(RuntimeError):
+                purge_deleted_courses(batch_size=2)
+        db.session.rollback()
+
+        deletion = CourseDeletion.query.one()
+        self.assertEqual(deletion.quizzes_purged, 2)
+        self.assertIsNone(deletion.completed_at)
+
+        self.assertEqual(purge_deleted_courses(batch_size=2, pause=0), 3)
+        self.assertIsNotNone(CourseDeletion.query.one().completed_at)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,150 @@
+import unittest
+from app import app, db, Quiz, UserStats, DailyActivity, compute_streaks
+from datetime import datetime, date, timedelta
+import json
+
+class TestDailyActivity(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def complete_quiz(self, course_name, correct_answers=1):
+        quiz = Quiz(
+            questions=[{"question": "Test", "options": ["A", "B", "C", "D"], "correct_answer": 0}],
+            course_name=course_name
+        )
+        db.session.add(quiz)
+        db.session.commit()
+
+        return self.client.post('/api/complete-quiz', json={
+            'correct_answers': correct_answers,
+            'totalQuestions': 1,
+            'course_name': course_name,
+            'quiz_id': quiz.id,
+            'course_details': {'daysToComplete': 5, 'quizzesPerDay': 2}
+        })
+
+    def test_completion_updates_rollup(self):
+        self.complete_quiz('Biology')
+        self.complete_quiz('Biology', correct_answers=0)
+        self.complete_quiz('Chemistry')
+
+        rows = {row.course_name: row for row in DailyActivity.query.all()}
+        self.assertEqual(len(rows), 2)
+        self.assertEqual(rows['Biology'].quizzes_completed, 2)
+        self.assertEqual(rows['Biology'].correct_answers, 1)
+        self.assertEqual(rows['Biology'].stars_earned, 11)
+        self.assertEqual(rows['Chemistry'].quizzes_completed, 1)
+
+    def test_repeated_completion_counts_once(self):
+        quiz = Quiz(
+            questions=[{"question": "Test", "options": ["A", "B", "C", "D"], "correct_answer": 0}],
+            course_name='Biology'
+        )
+        db.session.add(quiz)
+        db.session.commit()
+
+        for correct_answers in (0, 1):
+            self.client.post('/api/complete-quiz', json={
+                'correct_answers': correct_answers,
+                'totalQuestions': 1,
+                'course_name': 'Biology',
+                'quiz_id': quiz.id,
+                'course_details': {'daysToComplete': 5, 'quizzesPerDay': 2}
+            })
+
+        row = DailyActivity.query.one()
+        self.assertEqual(row.quizzes_completed, 1)
+        self.assertEqual(row.correct_answers, 1)
+        self.assertEqual(row.stars_earned, 6)
+
+        # Move the completion three days back, then complete the quiz again today
+        three_days_ago = datetime.utcnow().date() - timedelta(days=3)
+        quiz.completed_date = three_days_ago
+        row.day = three_days_ago
+        db.session.commit()
+        self.client.post('/api/complete-quiz', json={
+            'correct_answers': 1,
+            'totalQuestions': 1,
+            'course_name': 'Biology',
+            'quiz_id': quiz.id,
+            'course_details': {'daysToComplete': 5, 'quizzesPerDay': 2}
+        })
+
+        row = DailyActivity.query.one()
+        self.assertEqual(row.day, datetime.utcnow().date())
+        data = json.loads(self.client.get('/api/activity/streaks').data)
+        self.assertEqual(data['active_days'], 1)
+        self.assertEqual(data['current_streak'], 1)
+
+    def test_stats_streak_comes_from_rollup(self):
+        user_stats = UserStats(current_streak=3, last_quiz_date=datetime.utcnow() - timedelta(days=5))
+        db.session.add(user_stats)
+        db.session.commit()
+        db.session.add(DailyActivity(
+            user_id=user_stats.id,
+            day=datetime.utcnow().date() - timedelta(days=5),
+            course_name='Biology',
+            quizzes_completed=1
+        ))
+        db.session.commit()
+
+        data = json.loads(self.client.get('/api/complete-quiz').data)
+        self.assertEqual(data['current_streak'], 0)
+        self.assertEqual(data['longest_streak'], 1)
+
+    def test_calendar(self):
+        self.complete_quiz('Biology')
+        self.complete_quiz('Chemistry')
+
+        response = self.client.get('/api/activity/calendar')
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(len(data['days']), 1)
+        self.assertEqual(data['days'][0]['quizzesCompleted'], 2)
+
+        response = self.client.get('/api/activity/calendar?course=Biology')
+        data = json.loads(response.data)
+        self.assertEqual(data['days'][0]['quizzesCompleted'], 1)
+
+        response = self.client.get('/api/activity/calendar?start=not-a-date')
+        self.assertEqual(response.status_code, 400)
+
+    def test_streaks_from_rollup(self):
+        user_stats = UserStats()
+        db.session.add(user_stats)
+        db.session.commit()
+
+        today = datetime.utcnow().date()
+        for days_ago in (0, 1, 2, 5, 6, 7, 8):
+            db.session.add(DailyActivity(
+                user_id=user_stats.id,
+                day=today - timedelta(days=days_ago),
+                course_name='Biology',
+                quizzes_completed=1
+            ))
+        db.session.commit()
+
+        response = self.client.get('/api/activity/streaks')
+        data = json.loads(response.data)
+        self.assertEqual(data['current_streak'], 3)
+        self.assertEqual(data['longest_streak'], 4)
+        self.assertEqual(data['active_days'], 7)
+
+    def test_compute_streaks(self):
+        today = date(2024, 3, 10)
+        self.assertEqual(compute_streaks([], today), (0, 0))
+        self.assertEqual(compute_streaks([date(2024, 3, 9)], today), (1, 1))
+        self.assertEqual(compute_streaks([date(2024, 3, 1), date(2024, 3, 2)], today), (0, 2))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,145 @@
+import unittest
+from unittest import mock
+from app import app, db, Quiz, Course, UserStats, DailyActivity, daily_quota, bump_quota_generation, rebuild_daily_activity
+from sqlalchemy import event
+from datetime import datetime, timedelta
+import json
+import time
+
+class TestDailyQuota(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+        daily_quota.reset()
+
+        self.course = Course(
+            name='Test Course',
+            content='Test content',
+            days_to_complete=1,
+            quizzes_per_day=1,
+            questions_per_quiz=5,
+            additional_info=''
+        )
+        db.session.add(self.course)
+        db.session.commit()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def generate_quiz(self):
+        return self.client.post('/api/generate-quiz', json={'topic': 'Test Course'})
+
+    def count_statements(self, func):
+        statements = []
+
+        def before_cursor_execute(conn, cursor, statement, *args):
+            statements.append(statement)
+
+        event.listen(db.engine, 'before_cursor_execute', before_cursor_execute)
+        try:
+            result = func()
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', before_cursor_execute)
+        return result, statements
+
+    def test_cached_rejection_skips_database(self):
+        db.session.add(Quiz(
+            questions=[],
+            course_name='Test Course',
+            completed=True,
+            completed_date=datetime.utcnow().date()
+        ))
+        db.session.commit()
+        rebuild_daily_activity()
+
+        # The first request derives the count from the database
+        response = self.generate_quiz()
+        self.assertEqual(response.status_code, 429)
+
+        response, statements = self.count_statements(self.generate_quiz)
+        self.assertEqual(response.status_code, 429)
+        self.assertIn('already completed', json.loads(response.data)['error'].lower())
+        self.assertEqual(statements, [])
+
+        # Long after the last check only the generation row is read
+        with mock.patch('app.time.monotonic', return_value=time.monotonic() + daily_quota.check_interval + 1):
+            response, statements = self.count_statements(self.generate_quiz)
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(len(statements), 1)
+        self.assertIn('quota_generation', statements[0])
+
+    def test_sees_completions_from_other_workers(self):
+        today = datetime.utcnow().date()
+        daily_quota.set_limit('Test Course', 1)
+        self.assertEqual(daily_quota.completed_today('Test Course', today), 0)
+
+        # Another worker completes a quiz, only the shared counter row changes
+        user_stats = UserStats()
+        db.session.add(user_stats)
+        db.session.commit()
+        db.session.add(DailyActivity(
+            user_id=user_stats.id,
+            day=today,
+            course_name='Test Course',
+            quizzes_completed=1
+        ))
+        db.session.commit()
+
+        self.assertFalse(daily_quota.is_exhausted('Test Course', today))
+        self.assertEqual(daily_quota.completed_today('Test Course', today), 1)
+        self.assertTrue(daily_quota.is_exhausted('Test Course', today))
+
+    def test_repeated_completion_counts_once(self):
+        self.course.quizzes_per_day = 2
+        db.session.commit()
+        quiz = Quiz(questions=[], course_name='Test Course')
+        db.session.add(quiz)
+        db.session.commit()
+
+        # Warm the counters so completions are recorded in memory
+        today = datetime.utcnow().date()
+        daily_quota.set_limit('Test Course', 2)
+        daily_quota.completed_today('Test Course', today)
+
+        for _ in range(2):
+            self.client.post('/api/complete-quiz', json={
+                'correct_answers': 1,
+                'course_name': 'Test Course',
+                'quiz_id': quiz.id,
+                'course_details': {'daysToComplete': 1, 'quizzesPerDay': 2}
+            })
+
+        self.assertFalse(daily_quota.is_exhausted('Test Course', today))
+        self.assertEqual(daily_quota.completed_today('Test Course', today), 1)
+
+    def test_generation_bump_drops_cached_counts(self):
+        today = datetime.utcnow().date()
+        daily_quota.set_limit('Test Course', 1)
+        daily_quota.completed_today('Test Course', today)
+        daily_quota.record_completion('Test Course', today)
+        self.assertTrue(daily_quota.is_exhausted('Test Course', today))
+
+        # Another worker deleted the course, so the database count is back to zero
+        bump_quota_generation()
+        db.session.commit()
+        self.assertTrue(daily_quota.is_exhausted('Test Course', today))
+        with mock.patch('app.time.monotonic', return_value=time.monotonic() + daily_quota.check_interval + 1):
+            self.assertFalse(daily_quota.is_exhausted('Test Course', today))
+            self.assertEqual(daily_quota.completed_today('Test Course', today), 0)
+
+    def test_day_rollover(self):
+        today = datetime.utcnow().date()
+        daily_quota.set_limit('Test Course', 1)
+        daily_quota.completed_today('Test Course', today)
+        daily_quota.record_completion('Test Course', today)
+        self.assertTrue(daily_quota.is_exhausted('Test Course', today))
+        self.assertFalse(daily_quota.is_exhausted('Test Course', today + timedelta(days=1)))
+
+if __name__ == '__main__':
+    unittest.main()
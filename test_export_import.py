@@ -0,0 +1,140 @@
+import unittest
+from app import app, db, Course, Quiz, QuizArchive, CompletedCourse, UserStats, DailyActivity, run_compaction
+from datetime import datetime
+import gzip
+import json
+import os
+import tempfile
+
+class TestExportImport(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+        db.session.add(UserStats(quizzes_completed=2, total_stars=12, current_streak=1))
+        db.session.add(Course(
+            name='Test Course',
+            content='Test content',
+            days_to_complete=1,
+            quizzes_per_day=2,
+            questions_per_quiz=1
+        ))
+        for score in (0, 1):
+            db.session.add(Quiz(
+                questions=json.dumps([{"question": "Test", "options": ["A", "B", "C", "D"], "correct_answer": 0}]),
+                course_name='Test Course',
+                completed=True,
+                score=score,
+                total_questions=1,
+                user_answers=[score],
+                completed_date=datetime.utcnow().date()
+            ))
+        db.session.add(CompletedCourse(
+            course_name='Test Course',
+            completion_date=datetime.utcnow(),
+            total_score=1,
+            total_questions=2,
+            days_to_complete=1,
+            quizzes_completed=2,
+            quizzes_per_day=2
+        ))
+        db.session.commit()
+        run_compaction(vacuum=False)
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def assert_round_trip(self, export_body, ndjson):
+        records = [json.loads(line) for line in ndjson.splitlines()]
+        self.assertEqual(len(records), 7)
+        payload = QuizArchive.query.first().payload
+
+        response = self.client.post('/api/import?replace=1', data=export_body)
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.data)
+        self.assertEqual(data['imported']['quiz'], 2)
+        self.assertEqual(data['imported']['quiz_archive'], 2)
+
+        self.assertEqual(Quiz.query.count(), 2)
+        self.assertEqual(QuizArchive.query.first().payload, payload)
+        self.assertEqual(UserStats.query.one().total_stars, 12)
+        self.assertEqual(DailyActivity.query.one().quizzes_completed, 2)
+
+    def test_ndjson_round_trip(self):
+        response = self.client.get('/api/export')
+        self.assertEqual(response.mimetype, 'application/x-ndjson')
+        self.assert_round_trip(response.data, response.data)
+
+    def test_gzip_round_trip(self):
+        response = self.client.get('/api/export?gzip=1')
+        self.assertEqual(response.mimetype, 'application/gzip')
+        self.assert_round_trip(response.data, gzip.decompress(response.data))
+
+    def test_import_conflict(self):
+        export_body = self.client.get('/api/export').data
+        response = self.client.post('/api/import', data=export_body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('conflict', json.loads(response.data)['error'])
+
+    def test_import_into_new_database(self):
+        export_body = self.client.get('/api/export').data
+        db.drop_all()
+        db.create_all()
+        # A new database only holds the default stats row created at startup
+        db.session.add(UserStats(quizzes_completed=0, total_stars=0, current_level=1,
+                                 current_streak=0, last_quiz_date=None))
+        db.session.commit()
+
+        response = self.client.post('/api/import', data=export_body)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(UserStats.query.one().total_stars, 12)
+        self.assertEqual(Quiz.query.count(), 2)
+
+    def test_failed_replace_keeps_existing_data(self):
+        lines = self.client.get('/api/export').data.splitlines()
+        course_line = next(line for line in lines if b'"course"' in line)
+        body = b'\n'.join(lines + [course_line])
+
+        response = self.client.post('/api/import?replace=1', data=body)
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('each other', json.loads(response.data)['error'])
+        self.assertEqual(Course.query.count(), 1)
+        self.assertEqual(Quiz.query.count(), 2)
+
+    def test_record_columns(self):
+        response = self.client.post('/api/import?replace=1',
+                                    data=json.dumps({'type': 'course', 'data': {
+                                        'id': 7, 'name': 'Partial', 'content': '', 'days_to_complete': 1,
+                                        'quizzes_per_day': 1, 'questions_per_quiz': 1
+                                    }}))
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(Course.query.one().additional_info)
+
+        response = self.client.post('/api/import?replace=1',
+                                    data=json.dumps({'type': 'course', 'data': {'id': 8, 'colour': 'red'}}))
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('line 1', json.loads(response.data)['error'])
+        self.assertIn('colour', json.loads(response.data)['error'])
+        self.assertEqual(Course.query.one().name, 'Partial')
+
+    def test_cli_round_trip(self):
+        runner = app.test_cli_runner()
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.ndjson.gz')
+            result = runner.invoke(args=['export-data', path])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('Exported 7 records', result.output)
+
+            result = runner.invoke(args=['import-data', path, '--replace', '--chunk-size', '1'])
+            self.assertEqual(result.exit_code, 0)
+            self.assertIn('Imported 7 records', result.output)
+        self.assertEqual(Course.query.one().name, 'Test Course')
+
+if __name__ == '__main__':
+    unittest.main()
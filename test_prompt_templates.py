@@ -0,0 +1,68 @@
+import unittest
+from app import app, db, Course, PROMPT_TEMPLATES, build_prompt_messages, parse_quiz_response, record_prompt_usage
+import json
+
+class TestPromptTemplates(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///test.db'
+        self.client = app.test_client()
+        self.app_context = app.app_context()
+        self.app_context.push()
+        db.create_all()
+
+    def tearDown(self):
+        db.session.remove()
+        db.drop_all()
+        self.app_context.pop()
+
+    def test_parse_terse_schema(self):
+        questions = parse_quiz_response('{"q":[{"t":"2 + 2?","o":["3","4","5","6"],"a":1}]}')
+        self.assertEqual(questions, [{'question': '2 + 2?', 'options': ['3', '4', '5', '6'], 'correct_answer': 1}])
+
+    def test_parse_verbose_schema_with_stray_text(self):
+        content = 'Here is your quiz:\n```json\n{"questions": [' \
+                  '{"question": "2 + 2?", "options": ["3", "4", "5", "6"], "correct_answer": "1"},' \
+                  '{"question": "Broken", "options": ["A", "B"], "correct_answer": 0}]}\n```'
+        questions = parse_quiz_response(content)
+        self.assertEqual(len(questions), 1)
+        self.assertEqual(questions[0]['correct_answer'], 1)
+
+    def test_parse_failure(self):
+        with self.assertRaises(ValueError):
+            parse_quiz_response('Sorry, I cannot help with that.')
+        with self.assertRaises(ValueError):
+            parse_quiz_response('{"q": [{"t": "No options", "a": 0}]}')
+        for content in ('42', '"text"', 'null'):
+            with self.assertRaises(ValueError):
+                parse_quiz_response(content)
+
+    def test_templates_render(self):
+        course = Course(name='Biology', content='', days_to_complete=3, quizzes_per_day=2, questions_per_quiz=5)
+        for version in PROMPT_TEMPLATES:
+            messages = build_prompt_messages(version, course, 'Cells')
+            self.assertIn('Biology', messages[1]['content'])
+            self.assertIn('5', messages[1]['content'])
+        self.assertLess(len(build_prompt_messages('v2', course, '')[1]['content']),
+                        len(build_prompt_messages('v1', course, '')[1]['content']))
+
+    def test_prompt_stats(self):
+        record_prompt_usage('v2', 100, 400, 5, parse_failed=False)
+        record_prompt_usage('v2', 100, 50, 0, parse_failed=True)
+        db.session.commit()
+
+        response = self.client.get('/api/prompt-stats')
+        self.assertEqual(response.status_code, 200)
+        stats = json.loads(response.data)['versions'][0]
+        self.assertEqual(stats['version'], 'v2')
+        self.assertEqual(stats['calls'], 2)
+        self.assertEqual(stats['parseFailureRate'], 0.5)
+        self.assertEqual(stats['promptTokensPerQuestion'], 40)
+        self.assertEqual(stats['completionTokensPerQuestion'], 90)
+
+    def test_unknown_prompt_version(self):
+        response = self.client.post('/api/generate-quiz', json={'topic': 'Biology', 'promptVersion': 'v0'})
+        self.assertEqual(response.status_code, 400)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import unittest
+from unittest import mock
+import app as app_module
+from app import app, build_assets
+import gzip
+import os
+import tempfile
+import time
+
+class TestStaticAssets(unittest.TestCase):
+    def setUp(self):
+        app.config['TESTING'] = True
+        self.client = app.test_client()
+        self.directory = tempfile.TemporaryDirectory()
+        self.dist_dir = os.path.join(self.directory.name, 'static')
+        self.built_template_dir = os.path.join(self.directory.name, 'templates')
+        self.patches = [
+            mock.patch.object(app_module, 'ASSET_DIST_DIR', self.dist_dir),
+            mock.patch.object(app_module, 'BUILT_TEMPLATE_DIR', self.built_template_dir),
+            mock.patch.dict(app_module._page_cache, clear=True)
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in reversed(self.patches):
+            patch.stop()
+        self.directory.cleanup()
+
+    def test_build_extracts_inline_assets(self):
+        built = build_assets(self.dist_dir, self.built_template_dir)
+        self.assertEqual(sorted(built), ['index.html', 'quiz.html'])
+
+        for filenames in built.values():
+            self.assertEqual(sorted(name.rsplit('.', 1)[1] for name in filenames), ['css', 'js'])
+            for filename in filenames:
+                self.assertTrue(os.path.exists(os.path.join(self.dist_dir, filename + '.gz')))
+
+        with open(os.path.join(self.built_template_dir, 'index.html'), encoding='utf-8') as shell:
+            html = shell.read()
+        self.assertNotIn('<script>', html)
+        self.assertNotIn('<style>', html)
+        for filename in built['index.html']:
+            self.assertIn(f'/static/dist/{filename}', html)
+
+    def test_serves_precompressed_asset(self):
+        filename = next(name for name in build_assets(self.dist_dir, self.built_template_dir)['quiz.html']
+                        if name.endswith('.js'))
+        with open(os.path.join(self.dist_dir, filename), 'rb') as source:
+            script = source.read()
+
+        response = self.client.get(f'/static/dist/{filename}', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('immutable', response.headers['Cache-Control'])
+        self.assertEqual(gzip.decompress(response.data), script)
+
+        response = self.client.get(f'/static/dist/{filename}',
+                                   headers={'If-None-Match': response.headers['ETag'], 'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get(f'/static/dist/{filename}')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.data, script)
+
+        self.assertEqual(self.client.get('/static/dist/missing.js').status_code, 404)
+
+    def test_page_shell_is_cached(self):
+        build_assets(self.dist_dir, self.built_template_dir)
+
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'/static/dist/index.', response.data)
+
+        response = self.client.get('/', headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+        response = self.client.get('/quiz', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn(b'/static/dist/quiz.', gzip.decompress(response.data))
+
+    def test_rebuild_keeps_previous_fingerprints(self):
+        build_assets(self.dist_dir, self.built_template_dir)
+        first_shell = self.client.get('/').data
+
+        # An asset written long ago, superseded only by the next build
+        previous_asset = os.path.join(self.dist_dir, 'index.0123456789ab.js')
+        with open(previous_asset, 'w') as old_asset:
+            old_asset.write('// previous build')
+        os.utime(previous_asset, (0, 0))
+
+        shell_path = os.path.join(self.built_template_dir, 'index.html')
+        os.utime(shell_path, ns=(0, 0))
+        build_assets(self.dist_dir, self.built_template_dir)
+
+        self.assertEqual(self.client.get('/static/dist/index.0123456789ab.js').status_code, 200)
+        self.assertEqual(self.client.get(f'/static/dist/{app_module.SUPERSEDED_MANIFEST}').status_code, 404)
+        # The page cache notices the rebuilt shell
+        self.assertEqual(self.client.get('/').data, first_shell)
+        self.assertEqual(app_module._page_cache['index.html'][0], os.stat(shell_path).st_mtime_ns)
+
+        # Once the retention period has passed since it was superseded, it is pruned
+        with mock.patch('app.time.time', return_value=time.time() + app_module.ASSET_RETENTION_SECONDS + 1):
+            build_assets(self.dist_dir, self.built_template_dir)
+        self.assertFalse(os.path.exists(previous_asset))
+        self.assertEqual(self.client.get('/').status_code, 200)
+
+    def test_encodings_have_distinct_etags(self):
+        plain = self.client.get('/quiz')
+        compressed = self.client.get('/quiz', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotEqual(plain.headers['ETag'], compressed.headers['ETag'])
+
+        response = self.client.get('/quiz', headers={'If-None-Match': compressed.headers['ETag']})
+        self.assertEqual(response.status_code, 200)
+
+    def test_falls_back_to_inline_templates(self):
+        response = self.client.get('/')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b'<script>', response.data)
+
+if __name__ == '__main__':
+    unittest.main()